@@ -1,20 +1,49 @@
+import hashlib
+import html
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
 import streamlit as st
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import requests
-from fredapi import Fred
-from textblob import TextBlob
 
-# 🔹 OPTIONAL: Remove `newspaper3k` if errors persist
+# 🔹 OPTIONAL: News sentiment is disabled if `vaderSentiment` is not installed
 try:
-    from newspaper import Article
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
     NEWS_ENABLED = True
 except ImportError:
     NEWS_ENABLED = False
 
 # 🔹 Replace with FRED API Key (Not required for public data)
 FRED_API_KEY = "REPLACE_WITH_YOUR_KEY"
-fred = Fred(api_key=FRED_API_KEY) if FRED_API_KEY else None
+FRED_ENABLED = bool(FRED_API_KEY) and FRED_API_KEY != "REPLACE_WITH_YOUR_KEY"
+
+# ♻️ Process-wide clients (Streamlit re-executes this script on every rerun)
+@st.cache_resource
+def _session():
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+@st.cache_resource
+def _vader():
+    return SentimentIntensityAnalyzer() if NEWS_ENABLED else None
+
+session = _session()
+vader = _vader()
+
+# 📰 News parsing helpers
+NEWS_URL = "https://finance.yahoo.com/"
+NEWS_TTL = 600  # seconds
+# Matches plain-text <h3> headlines only; headlines wrapped in <a> or other tags are not matched
+HEADLINE_PATTERN = re.compile(r"<h3[^>]*>([^<]+)</h3>")
 
 # 📊 Economic Indicators
 ECONOMIC_INDICATORS = {
@@ -25,117 +54,246 @@ ECONOMIC_INDICATORS = {
     "PMI (Manufacturing)": "ISMPMI"
 }
 
+# 🔗 Latest-observation URL per indicator (fixed config, built once at import)
+FRED_OBSERVATIONS_URL = "https://api.stlouisfed.org/fred/series/observations"
+FRED_URLS = {
+    key: FRED_OBSERVATIONS_URL + "?" + urlencode({
+        "series_id": series,
+        "api_key": FRED_API_KEY,
+        "file_type": "json",
+        "sort_order": "desc",
+        "limit": 1,
+    })
+    for key, series in ECONOMIC_INDICATORS.items()
+}
+
 # 📊 Fetch Economic Data
+def _get_indicator(url):
+    # Timeouts, connection errors and 5xx raise, so st.cache_data doesn't store the outage.
+    # 4xx (bad key or series) and unparsable values are permanent, so they cache as NaN.
+    response = session.get(url, timeout=5)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    try:
+        response.raise_for_status()
+        return float(response.json()["observations"][0]["value"])
+    except Exception:
+        return float("nan")
+
+@st.cache_data(ttl=3600, show_spinner=False)  # FRED series update daily at most
 def get_economic_data():
-    data = {}
-    if fred:
-        for key, series in ECONOMIC_INDICATORS.items():
-            try:
-                data[key] = fred.get_series_latest_n(series, 1)[0]
-            except Exception:
-                data[key] = "N/A"
-    return data
-
-# 📰 Fetch News Sentiment (With Error Handling)
+    if not FRED_ENABLED:
+        return dict.fromkeys(ECONOMIC_INDICATORS, float("nan"))
+    # Each series is an independent HTTP request, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=len(ECONOMIC_INDICATORS)) as executor:
+        values = list(executor.map(_get_indicator, FRED_URLS.values()))
+    return dict(zip(FRED_URLS, values))
+
+# 📰 Fetch News Sentiment (raises on failure so errors aren't cached; callers fall back)
+NEWS_UNAVAILABLE = {"Sentiment": "N/A", "Score": 0, "Headlines": ["Failed to fetch news"]}
+
+@st.cache_data(ttl=NEWS_TTL, show_spinner=False)
 def get_news_sentiment():
     if not NEWS_ENABLED:
-        return {"Sentiment": "N/A", "Score": 0, "Headlines": ["News Scraping Disabled"]}
+        return {"Sentiment": "N/A", "Score": 0, "Headlines": ["News Scraping Disabled"], "Fetched": time.time()}
 
-    url = "https://finance.yahoo.com/"
-    try:
-        article = Article(url)
-        article.download()
-        article.parse()
-        article.nlp()
-        
-        headlines = article.keywords[:5]
-        sentiment_scores = [TextBlob(headline).sentiment.polarity for headline in headlines]
-        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-
-        sentiment_label = "Bullish" if avg_sentiment > 0 else "Bearish" if avg_sentiment < 0 else "Neutral"
-        return {"Sentiment": sentiment_label, "Score": round(avg_sentiment, 3), "Headlines": headlines}
+    response = session.get(NEWS_URL, timeout=5)
+    response.raise_for_status()
+
+    # Unescape before stripping so entity blanks like &nbsp; are dropped too; whitespace-only
+    # matches would otherwise dilute the score and render as empty bullets
+    headlines = []
+    for match in HEADLINE_PATTERN.findall(response.text):
+        headline = html.unescape(match).strip()
+        if headline:
+            headlines.append(headline)
+    headlines = headlines[:5]
+
+    # No matches means the page markup changed, not that the news is neutral
+    if not headlines:
+        return {"Sentiment": "N/A", "Score": 0, "Headlines": ["No headlines found"], "Fetched": time.time()}
+
+    # Score straight into a preallocated buffer
+    sentiment_scores = np.fromiter(
+        (vader.polarity_scores(headline)["compound"] for headline in headlines),
+        dtype=np.float32,
+        count=len(headlines),
+    )
+    avg_sentiment = float(sentiment_scores.mean())
+
+    sentiment_label = "Bullish" if avg_sentiment > 0 else "Bearish" if avg_sentiment < 0 else "Neutral"
+    return {
+        "Sentiment": sentiment_label,
+        "Score": round(avg_sentiment, 3),
+        "Headlines": headlines,
+        "Fetched": time.time(),  # Lets callers age the result even when served from cache
+    }
 
+# 💾 Disk Cache (survives restarts and is shared across worker processes)
+# Anchored to this file and app-owned, so clear_disk_cache() only removes our sidecars
+CACHE_DIR = Path(__file__).parent / ".cache" / "market_data"
+MARKET_DATA_TTL = 300  # seconds; worst-case age of a displayed price
+MARKET_MEMORY_TTL = 60  # in-process memo on top of the sidecar; the two ages add up
+MARKET_DISK_TTL = MARKET_DATA_TTL - MARKET_MEMORY_TTL
+
+def _cache_path(tickers, period, interval):
+    key = hashlib.md5(repr((sorted(tickers), period, interval)).encode()).hexdigest()
+    return CACHE_DIR / f"{key}.parquet"
+
+def cached_download(tickers, period, interval="1d", ttl=MARKET_DISK_TTL):
+    path = _cache_path(tickers, period, interval)
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return pd.read_parquet(path)
     except Exception:
-        return {"Sentiment": "N/A", "Score": 0, "Headlines": ["Failed to fetch news"]}
+        pass  # Missing or unreadable sidecar: treat as a cache miss and re-download
+
+    # One batched request for every symbol, adjusted closes only
+    closes = yf.download(
+        tickers, period=period, interval=interval,
+        auto_adjust=True, actions=False, threads=True, progress=False
+    )["Close"]
+    # Only persist frames that hold at least one price; an all-NaN response is a failed fetch
+    if closes.notna().any().any():
+        tmp_path = None
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write beside the target and rename, so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+            os.close(fd)
+            closes.to_parquet(tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except Exception:
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)  # Disk cache is best-effort
+    return closes
+
+def clear_disk_cache():
+    for path in CACHE_DIR.glob("*.parquet"):
+        path.unlink(missing_ok=True)
 
 # 📈 Fetch Market Data
+@st.cache_data(ttl=MARKET_MEMORY_TTL, show_spinner=False)
 def get_market_data(tickers):
-    data = {}
-    for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            data[ticker] = stock.history(period="1d")["Close"].iloc[-1]
-        except:
-            data[ticker] = None
-    return data
+    # Forward-fill so each ticker's last valid close lands in the final row,
+    # then read the last two rows. Failures raise so st.cache_data doesn't store them;
+    # the caller falls back to NaN.
+    closes = cached_download(tickers, period="5d").reindex(columns=tickers).ffill()
+    if closes.empty or closes.iloc[-1].isna().all():
+        raise ValueError("Yahoo Finance returned no prices")
+    latest = closes.iloc[-1].to_dict()
+    previous = closes.iloc[-2 if len(closes) > 1 else -1].to_dict()
+    return latest, previous
 
 # 🔺 Market Analysis
-def analyze_market_conditions(market_data, econ_data, news_sentiment):
-    spy_price = market_data.get("SPY", 0)
-    vix = market_data.get("^VIX", 0)
-    tnx = market_data.get("^TNX", 0) / 10.0  
+def analyze_market_conditions(market_data, prev_close, econ_data, news_sentiment):
+    # Coerce once so missing values compare False instead of raising
+    market = pd.to_numeric(pd.Series(market_data, dtype=object), errors="coerce")
+    previous = pd.to_numeric(pd.Series(prev_close, dtype=object), errors="coerce")
+    econ = pd.to_numeric(pd.Series(econ_data, dtype=object), errors="coerce")
+
+    spy_price = market.get("SPY", float("nan"))
+    spy_prev = previous.get("SPY", float("nan"))
+    spy_change = (spy_price - spy_prev) / spy_prev
+    vix = market.get("^VIX", float("nan"))
+    tnx = market.get("^TNX", float("nan"))  # Yahoo quotes ^TNX as the yield in percent
 
-    inflation = econ_data.get("Inflation (CPI)", 0)
-    fed_rate = econ_data.get("Fed Funds Rate", 0)
+    inflation = econ.get("Inflation (CPI)", float("nan"))
+    fed_rate = econ.get("Fed Funds Rate", float("nan"))
     sentiment_score = news_sentiment.get("Score", 0)
 
+    # Alerts are (severity, message) pairs; severities are keys of ALERT_RENDERERS
     alerts = []
     signal = "Neutral"
 
-    if spy_price and spy_price > spy_price * 1.002:
+    # SPY move vs. the previous close, with a ±0.2% dead band
+    if spy_change > 0.002:
         if vix < 15 and tnx < 3:
             signal = "Bullish"
-            alerts.append("Bullish Market: Favor equities (90% stocks / 10% bonds)")
+            alerts.append(("success", "Bullish Market: Favor equities (90% stocks / 10% bonds)"))
         elif vix > 30:
             signal = "High Volatility"
-            alerts.append("High Volatility: Consider reducing equity exposure")
+            alerts.append(("warning", "High Volatility: Consider reducing equity exposure"))
+    elif spy_change < -0.002:
+        signal = "Bearish"
 
     if inflation > 4 and fed_rate > 5:
-        alerts.append("🛑 Inflation Risk: Adjust bond allocation")
+        alerts.append(("warning", "🛑 Inflation Risk: Adjust bond allocation"))
 
     if sentiment_score < -0.2:
-        alerts.append("🔴 Bearish News Sentiment: Consider defensive positioning")
+        alerts.append(("warning", "🔴 Bearish News Sentiment: Consider defensive positioning"))
 
     return signal, alerts
 
+# 🧾 Display Formatting
+ALERT_RENDERERS = {"success": st.success, "warning": st.warning}
+MARKDOWN_SPECIAL = re.compile(r"([\\`*_{}\[\]()#+\-.!|$~<>])")
+
+def format_value(value):
+    return "N/A" if pd.isna(value) else f"{value:.2f}"
+
+def escape_markdown(text):
+    # Scraped text is literal; e.g. "$4 trillion ... $500 million" would otherwise render as LaTeX
+    return MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
 # 🔹 Streamlit UI
 st.title("📈 Market & Economic Alert System")
 
-# 🎯 Fetch Data
+# 🎯 Fetch Data (three different hosts, so overlap the requests)
 tickers = ["SPY", "^VIX", "^TNX"]
-market_data = get_market_data(tickers)
-econ_data = get_economic_data()
-news_sentiment = get_news_sentiment()
+session_news = st.session_state.get("news")
+news_is_fresh = session_news is not None and time.time() - session_news["Fetched"] < NEWS_TTL
+with ThreadPoolExecutor(max_workers=3) as executor:
+    market_future = executor.submit(get_market_data, tickers)
+    econ_future = executor.submit(get_economic_data)
+    news_future = None if news_is_fresh else executor.submit(get_news_sentiment)
+try:
+    market_data, prev_close = market_future.result()
+except Exception:
+    market_data = prev_close = dict.fromkeys(tickers, float("nan"))
+try:
+    econ_data = econ_future.result()
+except Exception:
+    econ_data = dict.fromkeys(ECONOMIC_INDICATORS, float("nan"))
+
+# Widget reruns reuse this session's headlines until NEWS_TTL after they were fetched;
+# failures are never kept
+if news_future:
+    try:
+        st.session_state.news = news_future.result()
+    except Exception:
+        st.session_state.pop("news", None)
+news_sentiment = st.session_state.get("news", NEWS_UNAVAILABLE)
 
 # 📊 Display Market Data
 st.subheader("Market Data")
-df_market = pd.DataFrame(market_data.items(), columns=["Ticker", "Latest Price"])
-st.dataframe(df_market)
+st.table({"Ticker": list(market_data), "Latest Price": [format_value(v) for v in market_data.values()]})
 
 # 📊 Display Economic Data
 st.subheader("Economic Indicators")
-df_econ = pd.DataFrame(econ_data.items(), columns=["Indicator", "Value"])
-st.dataframe(df_econ)
+st.table({"Indicator": list(econ_data), "Value": [format_value(v) for v in econ_data.values()]})
 
 # 📰 Display News Sentiment
 st.subheader("News Sentiment Analysis")
 st.write(f"**Market Sentiment:** {news_sentiment['Sentiment']} ({news_sentiment['Score']})")
 st.write("**Top Headlines:**")
-for headline in news_sentiment["Headlines"]:
-    st.write(f"- {headline}")
+st.markdown("\n".join(f"- {escape_markdown(headline)}" for headline in news_sentiment["Headlines"]))
 
 # 📊 Analyze Market Signals
-signal, alerts = analyze_market_conditions(market_data, econ_data, news_sentiment)
+signal, alerts = analyze_market_conditions(market_data, prev_close, econ_data, news_sentiment)
 
 # 🚨 Display Alerts
 st.subheader("Market Alerts & Signals")
 st.write(f"**Signal:** {signal}")
 if alerts:
-    for alert in alerts:
-        st.warning(alert)
+    for severity, message in alerts:
+        ALERT_RENDERERS[severity](message)
 else:
     st.success("No major alerts at this time.")
 
 # 🔄 Refresh Data Button
 if st.button("🔄 Refresh Market Data"):
-    st.experimental_rerun()
\ No newline at end of file
+    clear_disk_cache()
+    st.cache_data.clear()
+    st.session_state.pop("news", None)
+    st.rerun()
\ No newline at end of file